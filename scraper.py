@@ -18,15 +18,86 @@ import asyncio
 import json
 import re
 import sys
-from dataclasses import dataclass, asdict
-from typing import Optional
-from urllib.parse import quote
-
-from playwright.async_api import async_playwright, Page as AsyncPage
-from playwright.sync_api import sync_playwright, Page as SyncPage
-
-
-@dataclass
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from typing import AsyncIterator, Optional
+from urllib.parse import quote, urlsplit
+
+from playwright.async_api import (
+    async_playwright,
+    Error as PlaywrightError,
+    Browser as AsyncBrowser,
+    BrowserContext as AsyncBrowserContext,
+    Page as AsyncPage,
+    Playwright as AsyncPlaywright,
+    Response as AsyncResponse,
+    Route as AsyncRoute,
+    TargetClosedError,
+    TimeoutError as PlaywrightTimeoutError,
+)
+from playwright.sync_api import (
+    sync_playwright,
+    Page as SyncPage,
+    Response as SyncResponse,
+    Route as SyncRoute,
+)
+
+
+# Classifies a text line in one pass: leading-currency price, trailing-currency
+# price, "Free", or a bare number. Dispatch on match.lastgroup.
+_LINE_CLASSIFY = re.compile(
+    r'^(?P<pfx>[\$£€][\d,\.]+)'
+    r'|^(?P<sfx>[\d,\.]+\s*[\$£€])'
+    r'|^(?P<free>(?i:free))$'
+    r'|^(?P<digits>\d+)$'
+)
+_CURRENCY_PFX = re.compile(r'^[\$£€]')
+
+# Switch off Chromium subsystems a headless scraper never uses.
+_CHROMIUM_ARGS = [
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    '--disable-software-rasterizer',
+    '--disable-extensions',
+    '--disable-background-networking',
+    '--disable-sync',
+    '--metrics-recording-only',
+    '--no-first-run',
+    '--disable-features=Translate,BackForwardCache,MediaRouter',
+    '--renderer-process-limit=2',
+]
+
+_MARKETPLACE_URL = 'https://www.facebook.com/marketplace/'
+
+_COOKIE_ACCEPT_SELECTOR = 'button[data-cookiebanner="accept_button"]'
+_COOKIE_ALLOW_ALL_SELECTOR = 'button:has-text("Allow all cookies")'
+
+# Facebook redirects rate-limited or flagged sessions to these pages.
+_BLOCKED_PAGE_PATHS = ('/login', '/checkpoint')
+
+_VIEWPORT = {'width': 1920, 'height': 1080}
+_USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Resource types the scraper never reads. Image URLs come from the <img src>
+# attribute, so the image payload itself can be dropped.
+_BLOCKED_RESOURCE_TYPES = frozenset({
+    'image', 'stylesheet', 'font', 'media', 'texttrack', 'beacon', 'csp_report', 'imageset',
+})
+
+# Third-party trackers: aborted outright. Matches the host or any subdomain.
+_BLOCKED_HOSTS = ('connect.facebook.net', 'doubleclick.net', 'bat.bing.com', 'google-analytics.com')
+
+# Same-origin telemetry endpoints: answered with an empty 204 so the page
+# doesn't retry or wait on them.
+_STUBBED_PATHS = ('/ajax/bz', '/privacy_sandbox/')
+
+
+class RetryableScrapeError(Exception):
+    """Navigation failed or was blocked; the same scrape may succeed later."""
+
+
+@dataclass(slots=True, frozen=True)
 class MarketplaceListing:
     """Data model for a Facebook Marketplace listing."""
     listing_id: str
@@ -37,7 +108,7 @@ class MarketplaceListing:
     image_url: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ListingDetails:
     """Full details for a single Facebook Marketplace listing."""
     listing_id: str
@@ -57,48 +128,88 @@ def _parse_listing_text(all_text: str) -> tuple[str, str, str]:
     price = ''
     location = ''
 
-    lines = [line.strip() for line in all_text.split('\n') if line.strip()]
+    lines = [line for line in (raw.strip() for raw in all_text.splitlines()) if line]
 
     for line in lines:
+        match = _LINE_CLASSIFY.match(line)
+        kind = match.lastgroup if match else None
+
         # Price detection (£, $, €, or "Free")
-        if re.match(r'^[\$£€][\d,\.]+', line) or re.match(r'^[\d,\.]+\s*[\$£€]', line) or line.lower() == 'free':
+        if kind in ('pfx', 'sfx', 'free'):
             if not price:
                 price = line
-        elif not title and len(line) > 2 and not re.match(r'^\d+$', line):
+        elif not title and len(line) > 2 and kind != 'digits':
             title = line
         elif title and not location and len(line) > 2:
             location = line
 
+        # Nothing left to fill in
+        if title and price and location:
+            break
+
     return title, price, location
 
 
-async def extract_listings_from_page_async(page: AsyncPage) -> list[MarketplaceListing]:
-    """Extract listing data from the rendered page (async version)."""
+# Collects href, text and image src for every listing link in a single
+# round-trip instead of several CDP calls per link. The result grid is
+# virtualized, so it scrolls a viewport at a time and keeps harvesting until
+# no new listings appear for two rounds or max_items is reached.
+_EXTRACT_LISTINGS_JS = """async (maxItems) => {
+  const found = new Map();
+  const harvest = () => {
+    for (const a of document.querySelectorAll('a[href*="/marketplace/item/"]')) {
+      const href = a.getAttribute('href') || '';
+      const match = href.match(/\\/item\\/(\\d+)/);
+      if (!match || found.has(match[1])) continue;
+      const img = a.querySelector('img');
+      found.set(match[1], {href, text: a.innerText, src: img && img.getAttribute('src')});
+    }
+  };
+
+  harvest();
+  let stableRounds = 0;
+  while (found.size < maxItems && stableRounds < 2) {
+    const before = found.size;
+    window.scrollBy(0, window.innerHeight);
+    await new Promise(resolve => setTimeout(resolve, 400));
+    harvest();
+    stableRounds = found.size === before ? stableRounds + 1 : 0;
+  }
+  return Array.from(found.values()).slice(0, maxItems);
+}"""
+
+
+def _extract_item_id(href: str) -> Optional[str]:
+    """Return the numeric id following /marketplace/item/ in href, if any."""
+    _, sep, tail = href.partition('/marketplace/item/')
+    if not sep:
+        return None
+    end = 0
+    while end < len(tail) and tail[end].isdecimal():
+        end += 1
+    return tail[:end] or None
+
+
+def _listings_from_raw(raw: list[dict]) -> list[MarketplaceListing]:
+    """Build listings from the raw link records returned by _EXTRACT_LISTINGS_JS."""
     listings = []
-    seen_ids = set()
-
-    await page.wait_for_selector('a[href*="/marketplace/item/"]', timeout=15000)
-    listing_links = await page.query_selector_all('a[href*="/marketplace/item/"]')
+    seen_ids: set[int] = set()
 
-    for link in listing_links:
-        href = await link.get_attribute('href') or ''
-        match = re.search(r'/marketplace/item/(\d+)', href)
-        if not match:
+    for record in raw:
+        item_id = _extract_item_id(record.get('href') or '')
+        if item_id is None:
             continue
 
-        listing_id = match.group(1)
-        if listing_id in seen_ids:
+        # Dedup on the numeric id; ints hash cheaper than strings
+        listing_id_int = int(item_id)
+        if listing_id_int in seen_ids:
             continue
-        seen_ids.add(listing_id)
+        seen_ids.add(listing_id_int)
+        listing_id = str(listing_id_int)
 
-        all_text = (await link.inner_text()).strip()
+        all_text = (record.get('text') or '').strip()
         title, price, location = _parse_listing_text(all_text)
 
-        image_url = None
-        img = await link.query_selector('img')
-        if img:
-            image_url = await img.get_attribute('src')
-
         if title or price:
             listings.append(MarketplaceListing(
                 listing_id=listing_id,
@@ -106,52 +217,230 @@ async def extract_listings_from_page_async(page: AsyncPage) -> list[MarketplaceL
                 price=price or "Price not listed",
                 location=location,
                 url=f"https://www.facebook.com/marketplace/item/{listing_id}",
-                image_url=image_url,
+                image_url=record.get('src'),
             ))
 
     return listings
 
 
-def extract_listings_from_page_sync(page: SyncPage) -> list[MarketplaceListing]:
-    """Extract listing data from the rendered page (sync version)."""
-    listings = []
-    seen_ids = set()
+def _dig(obj, *keys):
+    """Walk nested dicts, returning None as soon as a key is missing."""
+    for key in keys:
+        if not isinstance(obj, dict):
+            return None
+        obj = obj.get(key)
+    return obj
 
-    page.wait_for_selector('a[href*="/marketplace/item/"]', timeout=15000)
-    listing_links = page.query_selector_all('a[href*="/marketplace/item/"]')
 
-    for link in listing_links:
-        href = link.get_attribute('href') or ''
-        match = re.search(r'/marketplace/item/(\d+)', href)
-        if not match:
+def _decode_graphql_body(body: str) -> list[dict]:
+    """Decode a GraphQL response body, which may hold several newline-separated JSON documents."""
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        chunks = body.splitlines()
+    else:
+        return [payload] if isinstance(payload, dict) else []
+
+    payloads = []
+    for chunk in chunks:
+        try:
+            payload = json.loads(chunk)
+        except ValueError:
             continue
+        if isinstance(payload, dict):
+            payloads.append(payload)
+    return payloads
 
-        listing_id = match.group(1)
-        if listing_id in seen_ids:
-            continue
-        seen_ids.add(listing_id)
 
-        all_text = link.inner_text().strip()
-        title, price, location = _parse_listing_text(all_text)
+def _listings_from_graphql(payloads: list[dict]) -> list[MarketplaceListing]:
+    """Build listings from intercepted marketplace_search GraphQL payloads."""
+    listings = []
+    seen_ids = set()
 
-        image_url = None
-        img = link.query_selector('img')
-        if img:
-            image_url = img.get_attribute('src')
+    for payload in payloads:
+        edges = _dig(payload, 'data', 'marketplace_search', 'feed_units', 'edges') or []
+        for edge in edges:
+            listing = _dig(edge, 'node', 'listing')
+            if not isinstance(listing, dict) or not listing.get('id'):
+                continue
+
+            listing_id = str(listing['id'])
+            if listing_id in seen_ids:
+                continue
+            seen_ids.add(listing_id)
 
-        if title or price:
             listings.append(MarketplaceListing(
                 listing_id=listing_id,
-                title=title or f"Listing {listing_id}",
-                price=price or "Price not listed",
-                location=location,
+                title=listing.get('marketplace_listing_title') or f"Listing {listing_id}",
+                price=_dig(listing, 'listing_price', 'formatted_amount') or "Price not listed",
+                location=_dig(listing, 'location', 'reverse_geocode', 'city') or '',
                 url=f"https://www.facebook.com/marketplace/item/{listing_id}",
-                image_url=image_url,
+                image_url=_dig(listing, 'primary_listing_photo', 'image', 'uri'),
             ))
 
     return listings
 
 
+def _merge_listings(
+    dom_listings: list[MarketplaceListing],
+    graphql_listings: list[MarketplaceListing],
+) -> list[MarketplaceListing]:
+    """
+    Combine DOM and GraphQL listings, keeping the page's display order.
+
+    GraphQL records replace DOM records with the same id (their fields are
+    cleaner); GraphQL-only listings are appended after the DOM ones.
+    """
+    graphql_by_id = {listing.listing_id: listing for listing in graphql_listings}
+    merged = [graphql_by_id.pop(listing.listing_id, listing) for listing in dom_listings]
+    return merged + list(graphql_by_id.values())
+
+
+def _graphql_collector_async(payloads: list[dict]):
+    """Build a response handler that stores marketplace_search GraphQL payloads (async version)."""
+    async def on_response(response: AsyncResponse) -> None:
+        if '/api/graphql/' not in response.url:
+            return
+        try:
+            body = await response.text()
+        except Exception:
+            return
+        if 'marketplace_search' in body:
+            payloads.extend(_decode_graphql_body(body))
+
+    return on_response
+
+
+def _graphql_collector_sync(payloads: list[dict]):
+    """Build a response handler that stores marketplace_search GraphQL payloads (sync version)."""
+    def on_response(response: SyncResponse) -> None:
+        if '/api/graphql/' not in response.url:
+            return
+        try:
+            body = response.text()
+        except Exception:
+            return
+        if 'marketplace_search' in body:
+            payloads.extend(_decode_graphql_body(body))
+
+    return on_response
+
+
+async def extract_listings_from_page_async(
+    page: AsyncPage,
+    graphql_payloads: Optional[list[dict]] = None,
+    max_items: int = 100,
+) -> list[MarketplaceListing]:
+    """
+    Extract listing data from the rendered page (async version).
+
+    Scrolls the result grid to load more listings. Results keep the
+    page's display order; intercepted GraphQL records replace matching
+    DOM records and any GraphQL-only listings are appended.
+    """
+    await page.wait_for_selector('a[href*="/marketplace/item/"]', timeout=15000)
+
+    raw = await page.evaluate(_EXTRACT_LISTINGS_JS, max_items)
+    listings = _listings_from_raw(raw)
+
+    if graphql_payloads:
+        listings = _merge_listings(listings, _listings_from_graphql(graphql_payloads))
+
+    return listings[:max_items]
+
+
+def extract_listings_from_page_sync(
+    page: SyncPage,
+    graphql_payloads: Optional[list[dict]] = None,
+    max_items: int = 100,
+) -> list[MarketplaceListing]:
+    """
+    Extract listing data from the rendered page (sync version).
+
+    Scrolls the result grid to load more listings. Results keep the
+    page's display order; intercepted GraphQL records replace matching
+    DOM records and any GraphQL-only listings are appended.
+    """
+    page.wait_for_selector('a[href*="/marketplace/item/"]', timeout=15000)
+
+    raw = page.evaluate(_EXTRACT_LISTINGS_JS, max_items)
+    listings = _listings_from_raw(raw)
+
+    if graphql_payloads:
+        listings = _merge_listings(listings, _listings_from_graphql(graphql_payloads))
+
+    return listings[:max_items]
+
+
+def _route_action(resource_type: str, url: str) -> str:
+    """Decide whether a request should be aborted, stubbed or let through."""
+    if resource_type in _BLOCKED_RESOURCE_TYPES:
+        return 'abort'
+    parts = urlsplit(url)
+    hostname = parts.hostname or ''
+    if any(hostname == host or hostname.endswith('.' + host) for host in _BLOCKED_HOSTS):
+        return 'abort'
+    if parts.path.startswith(_STUBBED_PATHS):
+        return 'fulfill'
+    return 'continue'
+
+
+async def _block_heavy_resources_async(route: AsyncRoute) -> None:
+    """Abort or stub requests that don't contribute listing data (async version)."""
+    action = _route_action(route.request.resource_type, route.request.url)
+    if action == 'abort':
+        await route.abort()
+    elif action == 'fulfill':
+        await route.fulfill(status=204, body='')
+    else:
+        await route.continue_()
+
+
+def _block_heavy_resources_sync(route: SyncRoute) -> None:
+    """Abort or stub requests that don't contribute listing data (sync version)."""
+    action = _route_action(route.request.resource_type, route.request.url)
+    if action == 'abort':
+        route.abort()
+    elif action == 'fulfill':
+        route.fulfill(status=204, body='')
+    else:
+        route.continue_()
+
+
+async def _accept_cookies_async(page: AsyncPage) -> None:
+    """Dismiss the cookie consent banner if it appears (async version)."""
+    button = page.locator(_COOKIE_ACCEPT_SELECTOR).or_(page.locator(_COOKIE_ALLOW_ALL_SELECTOR)).first
+    try:
+        await button.click(timeout=500)
+    except PlaywrightError:
+        pass
+
+
+async def _goto_async(page: AsyncPage, url: str) -> None:
+    """
+    Navigate to url, raising RetryableScrapeError on transient failures.
+
+    A navigation timeout or a redirect to the login/checkpoint page means
+    the scrape never saw the real page, so it is worth retrying.
+    """
+    try:
+        await page.goto(url, wait_until='domcontentloaded', timeout=30000)
+    except PlaywrightTimeoutError as e:
+        raise RetryableScrapeError(f"Timed out loading {url}") from e
+    if urlsplit(page.url).path.startswith(_BLOCKED_PAGE_PATHS):
+        raise RetryableScrapeError(f"Redirected to {page.url} while loading {url}")
+
+
+def _accept_cookies_sync(page: SyncPage) -> None:
+    """Dismiss the cookie consent banner if it appears (sync version)."""
+    button = page.locator(_COOKIE_ACCEPT_SELECTOR).or_(page.locator(_COOKIE_ALLOW_ALL_SELECTOR)).first
+    try:
+        button.click(timeout=500)
+    except PlaywrightError:
+        pass
+
+
+@lru_cache(maxsize=1024)
 def _build_url(query: str, location_id: str, locale: str, days_listed: Optional[int]) -> str:
     """Build the marketplace search URL."""
     encoded_query = quote(query)
@@ -161,202 +450,364 @@ def _build_url(query: str, location_id: str, locale: str, days_listed: Optional[
     return url
 
 
+class BrowserSession:
+    """
+    A long-lived Chromium browser with a pool of reusable contexts.
+
+    Launching Chromium dominates the cost of a single scrape, so callers
+    that scrape repeatedly (e.g. the MCP server) keep one session open.
+    Each scrape borrows a context with acquire_context() and only opens
+    and closes a page in it.
+    """
+
+    def __init__(self, headless: bool = True, pool_size: int = 1):
+        self.headless = headless
+        self.pool_size = pool_size
+        self.browser: Optional[AsyncBrowser] = None
+        self._playwright: Optional[AsyncPlaywright] = None
+        # Holds a context, or None for a slot whose context must be recreated
+        self._idle_contexts: Optional[asyncio.Queue[Optional[AsyncBrowserContext]]] = None
+        self._relaunch_lock = asyncio.Lock()
+
+    async def start(self) -> "BrowserSession":
+        """Launch the browser and create the pooled contexts."""
+        self._playwright = await async_playwright().start()
+        try:
+            await self._launch_browser()
+            self._idle_contexts = asyncio.Queue()
+            for _ in range(self.pool_size):
+                self._idle_contexts.put_nowait(await self._new_context())
+        except Exception:
+            await self.close()
+            raise
+        return self
+
+    async def close(self) -> None:
+        """Close the browser (and with it every context) and stop Playwright."""
+        if self.browser:
+            await self.browser.close()
+        if self._playwright:
+            await self._playwright.stop()
+        self.browser = None
+        self._playwright = None
+        self._idle_contexts = None
+
+    async def _launch_browser(self) -> None:
+        """Launch a Chromium browser for this session."""
+        self.browser = await self._playwright.chromium.launch(
+            headless=self.headless,
+            args=_CHROMIUM_ARGS,
+            ignore_default_args=['--enable-automation'],
+        )
+
+    async def _new_context(self) -> AsyncBrowserContext:
+        """Create a context on the current browser."""
+        return await self.browser.new_context(
+            viewport=_VIEWPORT,
+            user_agent=_USER_AGENT,
+        )
+
+    async def _live_context(self, context: Optional[AsyncBrowserContext]) -> AsyncBrowserContext:
+        """
+        Return context if it belongs to a running browser, else a fresh one.
+
+        Relaunches the browser first if it has crashed or been killed.
+        """
+        if not self.browser.is_connected():
+            async with self._relaunch_lock:
+                # Another borrower may have relaunched while we waited
+                if not self.browser.is_connected():
+                    try:
+                        await self.browser.close()
+                    except PlaywrightError:
+                        pass
+                    await self._launch_browser()
+        if context is None or context.browser is not self.browser:
+            context = await self._new_context()
+        return context
+
+    @asynccontextmanager
+    async def acquire_context(self) -> AsyncIterator[AsyncBrowserContext]:
+        """
+        Borrow a context from the pool, waiting if all are in use.
+
+        A crashed browser is relaunched on the next borrow, and a context
+        that was closed under a scrape is recreated rather than reused.
+        """
+        if self._idle_contexts is None:
+            raise RuntimeError("BrowserSession has not been started")
+        idle_contexts = self._idle_contexts
+        context = await idle_contexts.get()
+        try:
+            context = await self._live_context(context)
+            yield context
+        except TargetClosedError:
+            context = None
+            raise
+        finally:
+            idle_contexts.put_nowait(context)
+
+    async def prewarm(self) -> None:
+        """
+        Load the Marketplace homepage once in every pooled context.
+
+        Warms up connections and clears the cookie banner so the first
+        real scrape in each context doesn't pay for it. Best effort:
+        navigation failures are ignored.
+        """
+        async def warm_one() -> None:
+            async with self.acquire_context() as context:
+                page = await context.new_page()
+                try:
+                    await page.route('**/*', _block_heavy_resources_async)
+                    await page.goto(_MARKETPLACE_URL, wait_until='domcontentloaded', timeout=30000)
+                    await _accept_cookies_async(page)
+                except PlaywrightError:
+                    pass
+                finally:
+                    await page.close()
+
+        await asyncio.gather(*(warm_one() for _ in range(self.pool_size)))
+
+    async def __aenter__(self) -> "BrowserSession":
+        return await self.start()
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+
+async def scrape_marketplace_on_page(
+    page: AsyncPage,
+    query: str,
+    location_id: str = "108339199186201",
+    locale: str = "en_GB",
+    days_listed: Optional[int] = None,
+    polite_delay_ms: int = 0,
+    max_items: int = 100,
+) -> list[MarketplaceListing]:
+    """
+    Scrape Facebook Marketplace search results on an externally managed page.
+
+    The caller owns the page (and its browser) and is responsible for
+    closing it. Use this to reuse a long-lived BrowserSession.
+    """
+    url = _build_url(query, location_id, locale, days_listed)
+
+    await page.route('**/*', _block_heavy_resources_async)
+
+    # Search results arrive as GraphQL XHRs; capture them before navigating
+    graphql_payloads: list[dict] = []
+    page.on('response', _graphql_collector_async(graphql_payloads))
+
+    await _goto_async(page, url)
+
+    await _accept_cookies_async(page)
+
+    # Optional politeness delay; readiness is signalled by the
+    # listing selector wait inside the extractor, not by sleeping
+    if polite_delay_ms:
+        await page.wait_for_timeout(polite_delay_ms)
+
+    return await extract_listings_from_page_async(page, graphql_payloads, max_items=max_items)
+
+
 async def scrape_marketplace_async(
     query: str,
     location_id: str = "108339199186201",
     locale: str = "en_GB",
     days_listed: Optional[int] = None,
     headless: bool = True,
+    polite_delay_ms: int = 0,
+    max_items: int = 100,
+    context: Optional[AsyncBrowserContext] = None,
 ) -> list[MarketplaceListing]:
     """
     Scrape Facebook Marketplace search results (async version).
 
     Use this when calling from an async context (e.g., MCP server).
+    Pass a context borrowed from a BrowserSession to reuse its browser;
+    otherwise a throwaway browser is launched (and headless applies).
     """
-    url = _build_url(query, location_id, locale, days_listed)
-
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=headless)
-        context = await browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    if context is None:
+        async with BrowserSession(headless=headless) as session:
+            async with session.acquire_context() as own_context:
+                return await scrape_marketplace_async(
+                    query,
+                    location_id=location_id,
+                    locale=locale,
+                    days_listed=days_listed,
+                    polite_delay_ms=polite_delay_ms,
+                    max_items=max_items,
+                    context=own_context,
+                )
+
+    page = await context.new_page()
+    try:
+        return await scrape_marketplace_on_page(
+            page,
+            query=query,
+            location_id=location_id,
+            locale=locale,
+            days_listed=days_listed,
+            polite_delay_ms=polite_delay_ms,
+            max_items=max_items,
         )
-        page = await context.new_page()
+    finally:
+        await page.close()
 
-        try:
-            await page.goto(url, wait_until='networkidle', timeout=30000)
-
-            # Handle cookie consent
-            try:
-                cookie_btn = await page.query_selector('button[data-cookiebanner="accept_button"]')
-                if cookie_btn:
-                    await cookie_btn.click()
-                    await page.wait_for_timeout(1000)
-            except Exception:
-                pass
-
-            try:
-                cookie_btn = await page.query_selector('button:has-text("Allow all cookies")')
-                if cookie_btn:
-                    await cookie_btn.click()
-                    await page.wait_for_timeout(1000)
-            except Exception:
-                pass
-
-            # Wait for content to load
-            await page.wait_for_timeout(2000)
-
-            # Respectful delay before scraping (minimum 3 seconds)
-            # This helps respect Facebook's servers and reduces load
-            await page.wait_for_timeout(3000)
 
-            listings = await extract_listings_from_page_async(page)
+async def get_listing_details_on_page(
+    page: AsyncPage,
+    listing_id: str,
+    polite_delay_ms: int = 0,
+) -> ListingDetails:
+    """
+    Get full details for a specific listing on an externally managed page.
 
-        finally:
-            await browser.close()
+    The caller owns the page (and its browser) and is responsible for
+    closing it.
+    """
+    url = f"https://www.facebook.com/marketplace/item/{listing_id}"
 
-    return listings
+    await page.route('**/*', _block_heavy_resources_async)
+    await _goto_async(page, url)
+
+    await _accept_cookies_async(page)
+
+    # Wait for the listing to render instead of sleeping. Vehicle and
+    # property listings have no "Details" header, so race it against the
+    # location marker every listing page shows.
+    rendered = page.get_by_text('Details', exact=True).or_(page.get_by_text('Location is approximate')).first
+    try:
+        await rendered.wait_for(timeout=15000)
+    except PlaywrightTimeoutError:
+        pass
+
+    if polite_delay_ms:
+        await page.wait_for_timeout(polite_delay_ms)
+
+    # Get all text from the page
+    body_text = await page.inner_text('body')
+    lines = [line for line in (raw.strip() for raw in body_text.splitlines()) if line]
+
+    # Parse the listing details
+    title = ''
+    price = ''
+    location = ''
+    description = ''
+    condition = None
+    listed_date = None
+    details_idx = None
+
+    # Find key markers in the text
+    for i, line in enumerate(lines):
+        # Title usually appears after the "Details" section header
+        if details_idx is None and line == 'Details':
+            details_idx = i
+
+        # Price is usually a whole line of currency + amount
+        if not price:
+            match = _LINE_CLASSIFY.match(line)
+            if match and (match.lastgroup == 'free' or (match.lastgroup == 'pfx' and match.end() == len(line))):
+                price = line
+
+        # "Listed X days ago" or "Listed on..."
+        if line.startswith('Listed ') and ('ago' in line or 'in ' in line):
+            listed_date = line
+
+        # Condition markers
+        if line.startswith('Condition'):
+            # Next non-empty line is usually the condition value
+            if i + 1 < len(lines):
+                condition = lines[i + 1]
+
+        # Location marker
+        if 'Location is approximate' in line and i > 0:
+            # Location is usually a few lines before this
+            for j in range(i - 1, max(0, i - 5), -1):
+                if lines[j] and not lines[j].startswith('Listed') and len(lines[j]) > 3:
+                    location = lines[j]
+                    break
+
+        # Stop once every marker has been found
+        if price and listed_date and condition and location and details_idx is not None:
+            break
+
+    if details_idx:
+        # Look for title and description after Details
+        # Pattern: Details -> Condition -> [condition value] -> [title] -> [description lines]
+        found_condition = False
+        past_condition = False
+        desc_lines = []
+        for i in range(details_idx + 1, min(details_idx + 20, len(lines))):
+            line = lines[i]
+            if line == 'Condition':
+                found_condition = True
+                continue
+            if found_condition and not past_condition:
+                condition = line
+                past_condition = True
+                continue
+            if line in ['Message', 'Save', 'Share', 'Location is approximate']:
+                break
+            if past_condition and not title and len(line) > 5 and not _CURRENCY_PFX.match(line):
+                title = line
+            elif title and line != title and len(line) > 2 and line != condition:
+                desc_lines.append(line)
+
+        description = '\n'.join(desc_lines)
+
+    # Fallback: if no title found, use first substantial text
+    if not title:
+        for line in lines:
+            if len(line) > 10 and not _CURRENCY_PFX.match(line) and 'Facebook' not in line:
+                title = line
+                break
+
+    return ListingDetails(
+        listing_id=listing_id,
+        title=title,
+        price=price,
+        location=location,
+        description=description,
+        condition=condition,
+        listed_date=listed_date,
+        url=url,
+    )
 
 
 async def get_listing_details_async(
     listing_id: str,
     headless: bool = True,
+    polite_delay_ms: int = 0,
+    context: Optional[AsyncBrowserContext] = None,
 ) -> ListingDetails:
     """
     Get full details for a specific listing (async version).
 
     Args:
         listing_id: The Facebook Marketplace listing ID
-        headless: Run browser in headless mode
+        headless: Run browser in headless mode (only used without context)
+        polite_delay_ms: Extra delay before reading the page, in milliseconds
+        context: Context borrowed from a BrowserSession; a throwaway browser is launched if omitted
 
     Returns:
         ListingDetails with full description and metadata
     """
-    url = f"https://www.facebook.com/marketplace/item/{listing_id}"
-
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=headless)
-        context = await browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        )
-        page = await context.new_page()
-
-        try:
-            await page.goto(url, wait_until='networkidle', timeout=30000)
-
-            # Handle cookie consent
-            try:
-                cookie_btn = await page.query_selector('button[data-cookiebanner="accept_button"]')
-                if cookie_btn:
-                    await cookie_btn.click()
-                    await page.wait_for_timeout(1000)
-            except Exception:
-                pass
-
-            try:
-                cookie_btn = await page.query_selector('button:has-text("Allow all cookies")')
-                if cookie_btn:
-                    await cookie_btn.click()
-                    await page.wait_for_timeout(1000)
-            except Exception:
-                pass
-
-            await page.wait_for_timeout(2000)
-
-            # Respectful delay before scraping (minimum 3 seconds)
-            # This helps respect Facebook's servers and reduces load
-            await page.wait_for_timeout(3000)
-
-            # Get all text from the page
-            body_text = await page.inner_text('body')
-            lines = [line.strip() for line in body_text.split('\n') if line.strip()]
-
-            # Parse the listing details
-            title = ''
-            price = ''
-            location = ''
-            description = ''
-            condition = None
-            listed_date = None
-
-            # Find key markers in the text
-            for i, line in enumerate(lines):
-                # Price is usually a line starting with currency
-                if re.match(r'^[\$£€][\d,\.]+$', line) or line.lower() == 'free':
-                    if not price:
-                        price = line
-
-                # "Listed X days ago" or "Listed on..."
-                if line.startswith('Listed ') and ('ago' in line or 'in ' in line):
-                    listed_date = line
-
-                # Condition markers
-                if line.startswith('Condition'):
-                    # Next non-empty line is usually the condition value
-                    if i + 1 < len(lines):
-                        condition = lines[i + 1]
-
-                # Location marker
-                if 'Location is approximate' in line and i > 0:
-                    # Location is usually a few lines before this
-                    for j in range(i - 1, max(0, i - 5), -1):
-                        if lines[j] and not lines[j].startswith('Listed') and len(lines[j]) > 3:
-                            location = lines[j]
-                            break
-
-            # Find title - usually appears early and matches listing title pattern
-            # It often appears after "Details" section
-            details_idx = None
-            for i, line in enumerate(lines):
-                if line == 'Details':
-                    details_idx = i
-                    break
-
-            if details_idx:
-                # Look for title and description after Details
-                # Pattern: Details -> Condition -> [condition value] -> [title] -> [description lines]
-                found_condition = False
-                past_condition = False
-                desc_lines = []
-                for i in range(details_idx + 1, min(details_idx + 20, len(lines))):
-                    line = lines[i]
-                    if line == 'Condition':
-                        found_condition = True
-                        continue
-                    if found_condition and not past_condition:
-                        condition = line
-                        past_condition = True
-                        continue
-                    if line in ['Message', 'Save', 'Share', 'Location is approximate']:
-                        break
-                    if past_condition and not title and len(line) > 5 and not re.match(r'^[\$£€]', line):
-                        title = line
-                    elif title and line != title and len(line) > 2 and line != condition:
-                        desc_lines.append(line)
-
-                description = '\n'.join(desc_lines)
-
-            # Fallback: if no title found, use first substantial text
-            if not title:
-                for line in lines:
-                    if len(line) > 10 and not re.match(r'^[\$£€]', line) and 'Facebook' not in line:
-                        title = line
-                        break
-
-            return ListingDetails(
-                listing_id=listing_id,
-                title=title,
-                price=price,
-                location=location,
-                description=description,
-                condition=condition,
-                listed_date=listed_date,
-                url=url,
-            )
-
-        finally:
-            await browser.close()
+    if context is None:
+        async with BrowserSession(headless=headless) as session:
+            async with session.acquire_context() as own_context:
+                return await get_listing_details_async(
+                    listing_id,
+                    polite_delay_ms=polite_delay_ms,
+                    context=own_context,
+                )
+
+    page = await context.new_page()
+    try:
+        return await get_listing_details_on_page(page, listing_id, polite_delay_ms=polite_delay_ms)
+    finally:
+        await page.close()
 
 
 def scrape_marketplace(
@@ -366,6 +817,8 @@ def scrape_marketplace(
     days_listed: Optional[int] = None,
     headless: bool = True,
     debug: bool = False,
+    polite_delay_ms: int = 1000,
+    max_items: int = 100,
 ) -> list[MarketplaceListing]:
     """
     Scrape Facebook Marketplace search results (sync version).
@@ -375,38 +828,31 @@ def scrape_marketplace(
     url = _build_url(query, location_id, locale, days_listed)
 
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=headless)
+        browser = p.chromium.launch(
+            headless=headless,
+            args=_CHROMIUM_ARGS,
+            ignore_default_args=['--enable-automation'],
+        )
         context = browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            viewport=_VIEWPORT,
+            user_agent=_USER_AGENT,
         )
         page = context.new_page()
+        page.route('**/*', _block_heavy_resources_sync)
+
+        # Search results arrive as GraphQL XHRs; capture them before navigating
+        graphql_payloads: list[dict] = []
+        page.on('response', _graphql_collector_sync(graphql_payloads))
 
         try:
-            page.goto(url, wait_until='networkidle', timeout=30000)
-
-            # Handle cookie consent
-            try:
-                cookie_btn = page.query_selector('button[data-cookiebanner="accept_button"]')
-                if cookie_btn:
-                    cookie_btn.click()
-                    page.wait_for_timeout(1000)
-            except Exception:
-                pass
-
-            try:
-                cookie_btn = page.query_selector('button:has-text("Allow all cookies")')
-                if cookie_btn:
-                    cookie_btn.click()
-                    page.wait_for_timeout(1000)
-            except Exception:
-                pass
-
-            page.wait_for_timeout(2000)
-
-            # Respectful delay before scraping (minimum 3 seconds)
+            page.goto(url, wait_until='domcontentloaded', timeout=30000)
+
+            _accept_cookies_sync(page)
+
+            # Respectful delay before scraping
             # This helps respect Facebook's servers and reduces load
-            page.wait_for_timeout(3000)
+            if polite_delay_ms:
+                page.wait_for_timeout(polite_delay_ms)
 
             if debug:
                 page.screenshot(path='debug_screenshot.png')
@@ -414,7 +860,7 @@ def scrape_marketplace(
                     f.write(page.content())
                 print("Debug files saved: debug_screenshot.png, debug_page.html")
 
-            listings = extract_listings_from_page_sync(page)
+            listings = extract_listings_from_page_sync(page, graphql_payloads, max_items=max_items)
 
         except Exception as e:
             if debug:
@@ -438,6 +884,7 @@ def main():
     parser.add_argument('query', nargs='?', default='brewing fermenter', help='Search query')
     parser.add_argument('--location', default='108339199186201', help='Facebook location ID')
     parser.add_argument('--days', type=int, help='Only show listings from the last N days (e.g., 1, 7, 30)')
+    parser.add_argument('--delay', type=int, default=1000, help='Politeness delay before scraping, in milliseconds')
     parser.add_argument('--debug', action='store_true', help='Save debug screenshot and HTML')
     parser.add_argument('--no-headless', action='store_true', help='Show browser window')
     parser.add_argument('--json', action='store_true', help='Output as JSON')
@@ -454,6 +901,7 @@ def main():
             days_listed=args.days,
             headless=not args.no_headless,
             debug=args.debug,
+            polite_delay_ms=args.delay,
         )
 
         if not listings:
@@ -461,7 +909,10 @@ def main():
             return
 
         if args.json:
-            print(json.dumps([asdict(l) for l in listings], indent=2))
+            # Listing fields are flat strings, so a shallow projection is
+            # enough; asdict() would deep-copy every value
+            names = [f.name for f in fields(MarketplaceListing)]
+            print(json.dumps([{name: getattr(l, name) for name in names} for l in listings], indent=2))
         else:
             for listing in listings:
                 print(f"\nTitle: {listing.title}")
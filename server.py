@@ -11,13 +11,181 @@ Requirements:
 - MCP endpoint at /mcp
 """
 
-from typing import Optional
+import asyncio
+import dataclasses
+import operator
+import os
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Optional
 
-from fastmcp import FastMCP
+import uvicorn
+from cachetools import TTLCache
+from fastmcp import Context, FastMCP
+from fastmcp.exceptions import ToolError
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
 
-from scraper import scrape_marketplace_async, get_listing_details_async
+from scraper import (
+    BrowserSession,
+    MarketplaceListing,
+    RetryableScrapeError,
+    TargetClosedError,
+    get_listing_details_async,
+    scrape_marketplace_async,
+)
 
-mcp = FastMCP("Facebook Marketplace")
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+WORKERS = int(os.getenv("MCP_WORKERS", "1"))
+
+# Reply with plain JSON instead of an SSE stream. Plain JSON responses are
+# gzip-compressed (Starlette never compresses SSE), but progress
+# notifications are then not delivered while a tool runs.
+JSON_RESPONSE = os.getenv("MCP_JSON_RESPONSE", "").lower() in ("1", "true", "yes")
+
+# Cap on scrapes in flight. Each holds a Chromium page worth hundreds of MB,
+# and bursts trip Facebook's rate limiting.
+MAX_CONCURRENCY = int(os.getenv("MCP_MAX_CONCURRENCY", "8"))
+_scrape_semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+
+# Scrapes whose navigation timed out or landed on a login/checkpoint page
+# (usually rate limiting), or whose browser crashed under them, are retried
+# with exponential backoff: 1s, then 2s.
+# A search that renders but has no results is a final answer, not retried.
+SCRAPE_ATTEMPTS = 3
+RETRY_BASE_DELAY = 1.0
+
+# One headless browser shared by every tool call. Each call borrows one of
+# the pooled contexts and only opens a page in it.
+CONTEXT_POOL_SIZE = int(os.getenv("MCP_CONTEXT_POOL_SIZE", str(MAX_CONCURRENCY)))
+browser_session = BrowserSession(headless=True, pool_size=CONTEXT_POOL_SIZE)
+
+# Agents often repeat the same call within seconds; serve those from memory.
+CACHE_TTL = float(os.getenv("MCP_CACHE_TTL", "300"))
+_caches: dict[str, TTLCache] = {
+    "search": TTLCache(maxsize=1024, ttl=CACHE_TTL),
+    "details": TTLCache(maxsize=1024, ttl=CACHE_TTL),
+}
+_cache_stats: dict[str, dict[str, int]] = {name: {"hits": 0, "misses": 0} for name in _caches}
+_cache_lock = asyncio.Lock()
+
+# Fields a search_marketplace caller may select with fields=.
+_LISTING_FIELDS = tuple(f.name for f in dataclasses.fields(MarketplaceListing))
+
+# Fields returned by get_listing_details, read in one C-level attrgetter call.
+_DETAILS_KEYS = ("listing_id", "title", "price", "location", "description", "condition", "listed_date", "url")
+_details_projection = operator.attrgetter(*_DETAILS_KEYS)
+
+# Scrapes currently running, keyed like the caches. A concurrent duplicate
+# call awaits the running scrape instead of starting its own.
+_inflight: dict[tuple, asyncio.Task] = {}
+
+
+def _canon(query: str) -> str:
+    """Canonical form of a search query for cache keys: lowercase, single-spaced."""
+    return " ".join(query.lower().split())
+
+
+async def _cache_get(name: str, key):
+    """Look up a cached tool result, recording the hit or miss."""
+    async with _cache_lock:
+        value = _caches[name].get(key)
+        _cache_stats[name]["hits" if value is not None else "misses"] += 1
+    return value
+
+
+async def _cache_put(name: str, key, value) -> None:
+    """Store a tool result in the named cache."""
+    async with _cache_lock:
+        _caches[name][key] = value
+
+
+async def _single_flight(key: tuple, run: Callable[[], Awaitable]):
+    """
+    Await run(), or the identical call already in flight for key.
+
+    The scrape runs in its own task, so a caller that is cancelled only
+    stops waiting; the other callers still get the result.
+    """
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(run())
+        _inflight[key] = task
+        task.add_done_callback(lambda done: _single_flight_done(key, done))
+    return await asyncio.shield(task)
+
+
+def _single_flight_done(key: tuple, task: asyncio.Task) -> None:
+    """Drop a finished scrape from _inflight."""
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    # Mark the exception as retrieved so asyncio doesn't warn when every
+    # caller had already stopped waiting
+    if not task.cancelled():
+        task.exception()
+
+
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    """Launch the shared browser and context pool on startup and close them on shutdown."""
+    await browser_session.start()
+    # Warm the contexts in the background so startup isn't held up by it
+    prewarm = asyncio.create_task(browser_session.prewarm())
+    try:
+        yield
+    finally:
+        # Detached single-flight scrapes must stop before the browser closes
+        pending = [prewarm, *_inflight.values()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        await browser_session.close()
+
+
+mcp = FastMCP("Facebook Marketplace", lifespan=lifespan)
+
+
+async def _run_scrape(scrape, **kwargs):
+    """
+    Run a scrape on a pooled context under the concurrency cap.
+
+    Navigation failures, blocked pages and browser crashes are retried
+    with exponential backoff; other errors propagate.
+    """
+    async with _scrape_semaphore:
+        for attempt in range(SCRAPE_ATTEMPTS):
+            try:
+                async with browser_session.acquire_context() as context:
+                    return await scrape(context=context, **kwargs)
+            except (RetryableScrapeError, TargetClosedError):
+                if attempt == SCRAPE_ATTEMPTS - 1:
+                    raise
+                await asyncio.sleep(RETRY_BASE_DELAY * 2 ** attempt)
+
+
+async def _search(
+    query: str,
+    location_id: str,
+    days: Optional[int],
+    nocache: bool = False,
+) -> list[MarketplaceListing]:
+    """Run one search through the cache, single-flight and retrying scrape."""
+    location_id = location_id.strip()
+    cache_key = (_canon(query), location_id, days)
+    listings = None
+    if not nocache:
+        listings = await _cache_get("search", cache_key)
+
+    if listings is None:
+        listings = await _single_flight(("search", cache_key), lambda: _run_scrape(
+            scrape_marketplace_async,
+            query=query,
+            location_id=location_id,
+            days_listed=days,
+        ))
+        await _cache_put("search", cache_key, listings)
+
+    return listings
 
 
 @mcp.tool()
@@ -25,7 +193,9 @@ async def search_marketplace(
     query: str,
     days: Optional[int] = None,
     location_id: str = "108339199186201",
-) -> list[dict]:
+    fields: Optional[list[str]] = None,
+    nocache: bool = False,
+) -> list[MarketplaceListing] | list[dict]:
     """
     Search Facebook Marketplace for listings.
 
@@ -33,32 +203,88 @@ async def search_marketplace(
         query: Search term (e.g., "brewing fermenter", "iphone 15")
         days: Only show listings from the last N days (e.g., 1, 7, 30). If not specified, shows all.
         location_id: Facebook location ID. Default is a UK location.
+        fields: Only return these fields (any of listing_id, title, price, location, url,
+            image_url), e.g. ["title", "price"] to drop the long image URLs. Default is all.
+            Unknown names or an empty list are rejected.
 
     Returns:
         List of marketplace listings with title, price, location, url, and image_url.
     """
-    listings = await scrape_marketplace_async(
-        query=query,
-        location_id=location_id,
-        days_listed=days,
-        headless=True,
-    )
+    # Check fields before scraping so a typo doesn't cost a page load
+    if fields is not None:
+        unknown = sorted(set(fields) - set(_LISTING_FIELDS))
+        if unknown or not fields:
+            problem = f"Unknown fields {unknown}" if unknown else "fields is empty"
+            raise ToolError(f"{problem}; choose one or more of: {', '.join(_LISTING_FIELDS)}")
+
+    listings = await _search(query, location_id, days, nocache=nocache)
 
-    return [
-        {
-            "listing_id": l.listing_id,
-            "title": l.title,
-            "price": l.price,
-            "location": l.location,
-            "url": l.url,
-            "image_url": l.image_url,
-        }
-        for l in listings
-    ]
+    if fields is not None:
+        selected = [name for name in _LISTING_FIELDS if name in fields]
+        return [{name: getattr(l, name) for name in selected} for l in listings]
+
+    # Listings are dataclasses; FastMCP serializes them directly
+    return listings
 
 
 @mcp.tool()
-async def get_listing_details(listing_id: str) -> dict:
+async def search_marketplace_many(
+    queries: list[str],
+    ctx: Context,
+    days: Optional[int] = None,
+    location_id: str = "108339199186201",
+) -> dict[str, list[MarketplaceListing]]:
+    """
+    Search Facebook Marketplace for several queries at once.
+
+    Queries are scraped concurrently on the shared browser, so this is
+    faster than calling search_marketplace once per query. A progress
+    notification is sent as each query finishes.
+
+    A query whose scrape fails maps to an empty list instead of failing
+    the whole call. A search with no results also times out, so it ends
+    up the same way. The progress notification for that query carries the
+    error.
+
+    Args:
+        queries: Search terms (e.g., ["brewing fermenter", "brew kettle"])
+        days: Only show listings from the last N days (e.g., 1, 7, 30). If not specified, shows all.
+        location_id: Facebook location ID. Default is a UK location.
+
+    Returns:
+        Mapping of each query to its list of listings (same fields as search_marketplace),
+        empty for queries that failed or found nothing.
+    """
+    unique_queries = list(dict.fromkeys(queries))
+    results: dict[str, list[MarketplaceListing]] = {}
+
+    async def search_one(query: str) -> tuple[str, list[MarketplaceListing], Optional[str]]:
+        try:
+            return query, await _search(query, location_id, days), None
+        except Exception as e:
+            return query, [], f"{type(e).__name__}: {e}"
+
+    # Each query takes its own concurrency slot and retries like a single search
+    tasks = [asyncio.create_task(search_one(query)) for query in unique_queries]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            query, listings, error = await next_done
+            results[query] = listings
+            await ctx.report_progress(
+                progress=len(results),
+                total=len(unique_queries),
+                message=f"{query}: {error}" if error else f"{query}: {len(listings)} listings",
+            )
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    return {query: results[query] for query in unique_queries}
+
+
+@mcp.tool()
+async def get_listing_details(listing_id: str, nocache: bool = False) -> dict:
     """
     Get full details for a specific Facebook Marketplace listing.
 
@@ -71,24 +297,50 @@ async def get_listing_details(listing_id: str) -> dict:
     Returns:
         Full listing details including description, condition, and listing date.
     """
-    details = await get_listing_details_async(listing_id=listing_id, headless=True)
+    if not nocache:
+        cached = await _cache_get("details", listing_id)
+        if cached is not None:
+            return cached
+
+    details = await _single_flight(
+        ("details", listing_id),
+        lambda: _run_scrape(get_listing_details_async, listing_id=listing_id),
+    )
+
+    result = dict(zip(_DETAILS_KEYS, _details_projection(details)))
+    await _cache_put("details", listing_id, result)
+    return result
 
+
+@mcp.resource("stats://cache")
+def cache_stats() -> dict:
+    """Hit/miss counts and current size of the tool result caches."""
     return {
-        "listing_id": details.listing_id,
-        "title": details.title,
-        "price": details.price,
-        "location": details.location,
-        "description": details.description,
-        "condition": details.condition,
-        "listed_date": details.listed_date,
-        "url": details.url,
+        name: {**_cache_stats[name], "size": len(cache), "ttl_seconds": CACHE_TTL}
+        for name, cache in _caches.items()
     }
 
 
+# The ASGI app served by uvicorn. Built after every tool is registered.
+app = mcp.http_app(
+    path="/mcp",
+    transport="http",
+    stateless_http=True,
+    json_response=JSON_RESPONSE,
+    middleware=[Middleware(GZipMiddleware, minimum_size=1024)],
+)
+
+
 if __name__ == "__main__":
-    mcp.run(
-        transport="streamable-http",
-        host="0.0.0.0",
-        port=8000,
-        stateless_http=True,
+    # Stateless HTTP keeps no per-session state, so requests can go to any
+    # worker process. Each worker runs its own browser, pool and caches.
+    uvicorn.run(
+        # Multiple workers must import the app themselves
+        "server:app" if WORKERS > 1 else app,
+        host=HOST,
+        port=PORT,
+        workers=WORKERS,
+        loop="auto",  # uvloop when installed
+        http="auto",  # httptools when installed
+        log_level="info",
     )